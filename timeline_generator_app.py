@@ -1,33 +1,82 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime
 import plotly.express as px
+import plotly.io as pio
 import json
 import os
 import io
-
-def local_css(dark_mode):
-    # Base CSS, uses CSS variables for colors and styles
-    css = f"""
-    <style>
-        :root {{
-            --primary-color: {'#5AA9E6' if dark_mode else '#4A90E2'};
-            --primary-color-hover: {'#3B7DD8' if dark_mode else '#357ABD'};
-            --secondary-color: {'#718096' if dark_mode else '#A0AEC0'};
-            --background-color: {'#1E293B' if dark_mode else '#FFFFFF'};
-            --text-color: {'#F8FAFC' if dark_mode else '#222222'};
-        }}
-
-        .main .block-container {{
+import time
+
+try:
+    import openpyxl
+except ImportError:  # Excel exports go through xlsxwriter without openpyxl
+    openpyxl = None
+
+try:
+    import orjson
+except ImportError:  # keep working offline without orjson installed
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # fall back to JSON project files without msgpack installed
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pandas' CSV writer is used without pyarrow installed
+    pa = None
+
+try:
+    import xlsxwriter
+except ImportError:  # large exports also go through openpyxl without xlsxwriter
+    xlsxwriter = None
+
+# Extension used for newly saved project files
+PROJECT_EXT = ".msgpack" if msgpack is not None else ".json"
+
+# Project file extensions that can be loaded with the installed libraries
+LOADABLE_EXTS = (".json", ".msgpack") if msgpack is not None else (".json",)
+
+# Row count from which Excel exports switch to xlsxwriter's constant-memory mode
+EXCEL_STREAM_ROWS = 1000
+
+# Theme colors, exposed to the stylesheet as CSS variables
+_CSS_VARS_DARK = """
+        :root {
+            --primary-color: #5AA9E6;
+            --primary-color-hover: #3B7DD8;
+            --secondary-color: #718096;
+            --background-color: #1E293B;
+            --text-color: #F8FAFC;
+        }
+"""
+
+_CSS_VARS_LIGHT = """
+        :root {
+            --primary-color: #4A90E2;
+            --primary-color-hover: #357ABD;
+            --secondary-color: #A0AEC0;
+            --background-color: #FFFFFF;
+            --text-color: #222222;
+        }
+"""
+
+# Base CSS, uses CSS variables for colors and styles
+_CSS_RULES = """
+        .main .block-container {
             max-width: 900px;
             padding: 2rem 3rem;
             background: var(--background-color);
             border-radius: 15px;
             box-shadow: 0 8px 24px rgba(0,0,0,0.1);
             color: var(--text-color);
-        }}
+        }
 
-        .stTextInput>div>div>input, .stNumberInput>div>div>input {{
+        .stTextInput>div>div>input, .stNumberInput>div>div>input {
             border-radius: 10px !important;
             padding: 0.6rem 1rem;
             font-size: 1rem;
@@ -35,16 +84,16 @@ def local_css(dark_mode):
             background-color: var(--background-color);
             color: var(--text-color);
             transition: border-color 0.3s, background-color 0.3s, color 0.3s;
-        }}
+        }
 
-        .stTextInput>div>div>input:focus, .stNumberInput>div>div>input:focus {{
+        .stTextInput>div>div>input:focus, .stNumberInput>div>div>input:focus {
             border-color: var(--primary-color);
             outline: none;
             background-color: var(--background-color);
             color: var(--text-color);
-        }}
+        }
 
-        div.stButton > button {{
+        div.stButton > button {
             background-color: var(--primary-color);
             color: white;
             border-radius: 15px;
@@ -54,19 +103,19 @@ def local_css(dark_mode):
             transition: background-color 0.3s;
             border: none;
             cursor: pointer;
-        }}
+        }
 
-        div.stButton > button:hover {{
+        div.stButton > button:hover {
             background-color: var(--primary-color-hover);
-        }}
+        }
 
-        h1, h2, h3 {{
+        h1, h2, h3 {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             font-weight: 700;
             color: var(--text-color);
-        }}
+        }
 
-        textarea {{
+        textarea {
             border-radius: 10px !important;
             padding: 0.8rem !important;
             border: 1.5px solid var(--secondary-color) !important;
@@ -74,49 +123,248 @@ def local_css(dark_mode):
             background-color: var(--background-color) !important;
             color: var(--text-color) !important;
             transition: background-color 0.3s, color 0.3s;
-        }}
+        }
 
-        .stDataFrame > div {{
+        .stDataFrame > div {
             border-radius: 15px;
             overflow-x: auto;
             box-shadow: 0 4px 20px rgba(0,0,0,0.05);
             background-color: var(--background-color);
             color: var(--text-color);
-        }}
-    </style>
-    """
-    st.markdown(css, unsafe_allow_html=True)
-
-# Function to save project data to JSON
-def save_project_to_json(filename, project_name, start_date, phases, notes):
-    data = {
+        }
+"""
+
+# Full style blocks per theme, assembled once at import time
+_CSS_DARK = "\n    <style>" + _CSS_VARS_DARK + _CSS_RULES + "    </style>\n"
+_CSS_LIGHT = "\n    <style>" + _CSS_VARS_LIGHT + _CSS_RULES + "    </style>\n"
+
+def local_css(dark_mode):
+    # Emitted on every run: Streamlit drops elements a rerun doesn't re-send
+    st.markdown(_CSS_DARK if dark_mode else _CSS_LIGHT, unsafe_allow_html=True)
+
+# Function to build the serializable project dict (date stored as a string tag)
+def project_data(project_name, start_date, phases, notes):
+    return {
         "project_name": project_name,
         "start_date": start_date.strftime("%Y-%m-%d"),
         "phases": phases,
         "notes": notes
     }
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=4)
+
+# Function to save project data to JSON (compact unless pretty is requested)
+def save_project_to_json(filename, project_name, start_date, phases, notes, pretty=False):
+    data = project_data(project_name, start_date, phases, notes)
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(data, option=option))
+    else:
+        with open(filename, "w") as f:
+            if pretty:
+                json.dump(data, f, indent=4)
+            else:
+                json.dump(data, f, separators=(",", ":"))
 
 # Function to load project data from JSON
 def load_project_from_json(filename):
-    with open(filename, "r") as f:
-        data = json.load(f)
+    if orjson is not None:
+        with open(filename, "rb") as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(filename, "r") as f:
+            data = json.load(f)
     data["start_date"] = datetime.strptime(data["start_date"], "%Y-%m-%d")
     return data
 
-# Function to list local project files
-def list_local_projects():
-    return [f for f in os.listdir() if f.endswith(".json") and f.startswith("project_")]
+# Function to save project data to msgpack
+def save_project_to_msgpack(filename, project_name, start_date, phases, notes):
+    data = project_data(project_name, start_date, phases, notes)
+    with open(filename, "wb") as f:
+        f.write(msgpack.packb(data))
+
+# Function to load project data from msgpack
+def load_project_from_msgpack(filename):
+    with open(filename, "rb") as f:
+        data = msgpack.unpackb(f.read())
+    data["start_date"] = datetime.strptime(data["start_date"], "%Y-%m-%d")
+    return data
+
+# Function to save a project, choosing the format from the file extension
+def save_project(filename, project_name, start_date, phases, notes, pretty=False):
+    if filename.endswith(".msgpack"):
+        save_project_to_msgpack(filename, project_name, start_date, phases, notes)
+    else:
+        save_project_to_json(filename, project_name, start_date, phases, notes, pretty=pretty)
 
-# Function to export to Excel bytes
+# Function to load a project, choosing the format from the file extension
+def load_project(filename):
+    if filename.endswith(".msgpack"):
+        return load_project_from_msgpack(filename)
+    return load_project_from_json(filename)
+
+# Function to list local project files (cached briefly, cleared on save)
+@st.cache_data(ttl=5)
+def list_local_projects():
+    with os.scandir(".") as it:
+        entries = [
+            (e.name, e.stat().st_mtime) for e in it
+            if e.name.startswith("project_") and e.name.endswith(LOADABLE_EXTS)
+        ]
+    # Most recently saved first
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return [name for name, _ in entries]
+
+# Function to export to Excel bytes (write-only workbook, no per-cell styling pass)
 def to_excel(df):
+    if xlsxwriter is not None and (openpyxl is None or len(df) >= EXCEL_STREAM_ROWS):
+        return to_excel_constant_memory(df)
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Timeline')
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('Timeline')
+    ws.append(list(df.columns))
+    # Timestamps are datetime subclasses, so openpyxl writes them as native Excel dates
+    for row in df.itertuples(index=False, name=None):
+        ws.append(row)
+    wb.save(output)
     processed_data = output.getvalue()
     return processed_data
 
+# Function to export to Excel bytes with xlsxwriter (large frames, or no openpyxl), flushing each row as it is written
+def to_excel_constant_memory(df):
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+    ws = wb.add_worksheet('Timeline')
+    ws.write_row(0, 0, list(df.columns))
+    for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        ws.write_row(row_idx, 0, row)
+    wb.close()
+    processed_data = output.getvalue()
+    return processed_data
+
+# Function to export to CSV bytes (pyarrow's C++ writer when available)
+def to_csv(df):
+    if pa is None:
+        return df.to_csv(index=False).encode('utf-8')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Timeline dates are always midnight, so write them as plain dates and leave
+    # values unquoted, matching pandas' "Req,2024-01-01,2024-01-15,2" output
+    schema = pa.schema([
+        f.with_type(pa.date32()) if pa.types.is_timestamp(f.type) else f
+        for f in table.schema
+    ])
+    buf = pa.BufferOutputStream()
+    options = pacsv.WriteOptions(quoting_style="none", quoting_header="none")
+    try:
+        pacsv.write_csv(table.cast(schema), buf, write_options=options)
+    except pa.ArrowInvalid:
+        # A value needs quoting (comma, quote or newline); pandas quotes just that value
+        return df.to_csv(index=False).encode('utf-8')
+    return buf.getvalue().to_pybytes()
+
+# Build the timeline DataFrame, cached on (start date, (phase, weeks) tuples)
+@st.cache_data
+def build_timeline(start_date, phases_key):
+    base = pd.Timestamp(start_date)
+    names = [name for name, _ in phases_key]
+    durations = np.asarray([weeks for _, weeks in phases_key], dtype=np.int32)
+
+    # Phase ends are the running total of weeks; each phase starts where the previous one ended
+    ends = np.cumsum(durations)
+    starts = ends - durations
+
+    return pd.DataFrame({
+        "Phase": names,
+        "Start Date": base + pd.to_timedelta(starts, unit="W"),
+        "End Date": base + pd.to_timedelta(ends, unit="W"),
+        "Duration (weeks)": durations
+    })
+
+# Cached download encodings, keyed the same way as build_timeline
+@st.cache_data
+def timeline_csv(start_date, phases_key):
+    return to_csv(build_timeline(start_date, phases_key))
+
+@st.cache_data
+def timeline_excel(start_date, phases_key):
+    return to_excel(build_timeline(start_date, phases_key))
+
+@st.cache_data
+def timeline_json(start_date, phases_key):
+    df = build_timeline(start_date, phases_key)
+    # Plain Python records, so the encoder handles datetimes natively
+    records = [
+        {"Phase": name, "Start Date": start, "End Date": end, "Duration (weeks)": weeks}
+        for name, start, end, weeks in zip(
+            df["Phase"].tolist(),
+            df["Start Date"].to_numpy().astype("datetime64[us]").tolist(),
+            df["End Date"].to_numpy().astype("datetime64[us]").tolist(),
+            df["Duration (weeks)"].tolist()
+        )
+    ]
+    if orjson is not None:
+        return orjson.dumps(records)
+    # Compact and unescaped, so the bytes match orjson's output
+    return json.dumps(records, default=datetime.isoformat, separators=(",", ":"), ensure_ascii=False).encode('utf-8')
+
+# Gantt chart figure as JSON, cached so reruns skip px.timeline construction
+@st.cache_data
+def gantt_json(project_name, phases_key, start_date):
+    fig = px.timeline(
+        build_timeline(start_date, phases_key),
+        x_start="Start Date",
+        x_end="End Date",
+        y="Phase",
+        color="Phase",
+        title=f"{project_name} Timeline Gantt Chart",
+        hover_data=["Duration (weeks)"]
+    )
+    fig.update_yaxes(autorange="reversed")
+    fig.update_layout(showlegend=False, template="plotly_white")
+    return fig.to_json()
+
+# Hashable (phase, weeks) tuples used to detect edits and as the timeline cache key
+def phases_to_key(phases):
+    return tuple((p["Phase"], p["Duration (weeks)"]) for p in phases)
+
+# Snapshot the phases as the editor's base data and drop its pending edits.
+# Call whenever st.session_state.phases is replaced outside the editor.
+def reset_phases_editor():
+    st.session_state.phases_base = pd.DataFrame(st.session_state.phases, columns=["Phase", "Duration (weeks)"])
+    st.session_state.phases_key = phases_to_key(st.session_state.phases)
+    st.session_state.pop("phases_editor", None)
+
+# Timeline table, Gantt chart and downloads, always built from the current inputs.
+# As a fragment, clicks inside it (e.g. downloads) rerun only this section.
+@st.fragment
+def render_timeline_section():
+    start_date = st.session_state.start_date
+    phases_key = st.session_state.phases_key
+    timeline_df = build_timeline(start_date, phases_key)
+
+    st.subheader(f"📑 {st.session_state.project_name} Timeline")
+    st.dataframe(timeline_df, width="stretch")
+
+    # Progress bar with % label
+    total_weeks = sum(weeks for _, weeks in phases_key)
+    completed_weeks = 0  # You can customize this with actual progress input
+    progress = (completed_weeks / total_weeks) if total_weeks else 0
+    st.progress(progress)
+    st.caption(f"Progress: {progress*100:.1f}% (Customizable in future)")
+
+    # Plot Gantt chart
+    fig = pio.from_json(gantt_json(st.session_state.project_name, phases_key, start_date))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Download CSV and Excel; encodings are deferred until a button is clicked
+    col1, col2 = st.columns(2)
+    col1.download_button("📥 Download CSV", data=lambda: timeline_csv(start_date, phases_key), file_name=f"{st.session_state.project_name}_timeline.csv", mime="text/csv")
+    col2.download_button("📥 Download Excel", data=lambda: timeline_excel(start_date, phases_key), file_name=f"{st.session_state.project_name}_timeline.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    # Save timeline to JSON option
+    st.download_button("📥 Download Timeline JSON", data=lambda: timeline_json(start_date, phases_key), file_name=f"{st.session_state.project_name}_timeline.json", mime="application/json")
+
 
 # Add theme toggle in sidebar
 theme_choice = st.sidebar.selectbox("Choose Theme", options=["Light Mode", "Dark Mode"])
@@ -132,12 +380,14 @@ project_files = list_local_projects()
 selected_project = st.sidebar.selectbox("📂 Load Existing Project", [""] + project_files)
 
 if selected_project and st.sidebar.button("📥 Load Project"):
-    loaded_data = load_project_from_json(selected_project)
+    loaded_data = load_project(selected_project)
     st.session_state.project_name = loaded_data["project_name"]
     st.session_state.start_date = loaded_data["start_date"]
     st.session_state.phases = loaded_data["phases"]
     st.session_state.notes = loaded_data.get("notes", "")
-    st.experimental_rerun()
+    st.session_state.show_timeline = False
+    reset_phases_editor()
+    st.rerun()
 
 # New project button
 if st.sidebar.button("🆕 Start New Project"):
@@ -145,7 +395,9 @@ if st.sidebar.button("🆕 Start New Project"):
     st.session_state.start_date = datetime.today()
     st.session_state.phases = []
     st.session_state.notes = ""
-    st.experimental_rerun()
+    st.session_state.show_timeline = False
+    reset_phases_editor()
+    st.rerun()
 
 # Default session values
 if "project_name" not in st.session_state:
@@ -160,13 +412,19 @@ if "phases" not in st.session_state or not st.session_state.phases:
         {"Phase": "Testing & QA", "Duration (weeks)": 3},
         {"Phase": "Deployment & Launch", "Duration (weeks)": 1}
     ]
+    reset_phases_editor()
+if "phases_base" not in st.session_state or "phases_key" not in st.session_state:
+    reset_phases_editor()
 if "notes" not in st.session_state:
     st.session_state.notes = ""
 
 # Project details inputs
 with st.sidebar.expander("Project Details", expanded=True):
     st.session_state.project_name = st.text_input("Project Name", st.session_state.project_name)
-    st.session_state.start_date = st.date_input("Project Start Date", st.session_state.start_date)
+    # Stored as a midnight datetime so the timeline builder and cache keys get one type
+    start_day = st.date_input("Project Start Date", st.session_state.start_date)
+    st.session_state.start_date = datetime.combine(start_day, datetime.min.time())
+    pretty_json = st.checkbox("Save as readable JSON", value=False, help="Indented JSON instead of the compact default format")
 
 # Add new phase section
 with st.sidebar.expander("Add New Phase", expanded=True):
@@ -179,8 +437,9 @@ with st.sidebar.expander("Add New Phase", expanded=True):
                 "Phase": new_phase_name.strip(),
                 "Duration (weeks)": new_phase_duration
             })
+            reset_phases_editor()
             st.sidebar.success(f"Added '{new_phase_name.strip()}'")
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.sidebar.error("Phase name cannot be empty.")
 
@@ -188,80 +447,50 @@ with st.sidebar.expander("Add New Phase", expanded=True):
 st.subheader("📝 Project Notes")
 st.session_state.notes = st.text_area("Notes (optional)", st.session_state.notes, height=150)
 
-# Phases list with edit & remove buttons
-if st.session_state.phases:
-    st.subheader("📌 Project Phases")
-    for idx, phase in enumerate(st.session_state.phases):
-        cols = st.columns([4, 2, 1])
-        new_name = cols[0].text_input(f"Phase {idx+1} Name", phase["Phase"], key=f"name_{idx}")
-        new_duration = cols[1].number_input("Weeks", min_value=1, max_value=52, value=phase["Duration (weeks)"], key=f"duration_{idx}")
-        if cols[2].button("❌", key=f"remove_{idx}"):
-            st.session_state.phases.pop(idx)
-            st.experimental_rerun()
-        if new_name != phase["Phase"] or new_duration != phase["Duration (weeks)"]:
-            st.session_state.phases[idx] = {"Phase": new_name, "Duration (weeks)": new_duration}
+# Phases table: a single editable grid (edit cells, add or delete rows).
+# Inside a form, edits don't rerun the script until "Apply" is pressed.
+st.subheader("📌 Project Phases")
+with st.form("phases_form"):
+    edited_phases = st.data_editor(
+        st.session_state.phases_base,
+        column_config={
+            "Phase": st.column_config.TextColumn("Phase", required=True),
+            "Duration (weeks)": st.column_config.NumberColumn("Duration (weeks)", min_value=1, max_value=52, step=1, required=True)
+        },
+        num_rows="dynamic",
+        hide_index=True,
+        width="stretch",
+        key="phases_editor"
+    )
+    phases_submitted = st.form_submit_button("✅ Apply Phase Changes")
+
+if phases_submitted:
+    # Ignore half-filled rows the user is still adding
+    edited_phases = edited_phases.dropna()
+    new_key = tuple(zip(edited_phases["Phase"].tolist(), edited_phases["Duration (weeks)"].astype(int).tolist()))
+    # Only replace the phases (and so the timeline cache key) when something changed
+    if new_key != st.session_state.phases_key:
+        st.session_state.phases = [{"Phase": name, "Duration (weeks)": weeks} for name, weeks in new_key]
+        st.session_state.phases_key = new_key
+    # An emptied list can't be drawn, same as Generate refusing one
+    if not new_key:
+        st.session_state.show_timeline = False
 
 # Save project button
 if st.button("💾 Save Project"):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"project_{timestamp}.json"
-    save_project_to_json(filename, st.session_state.project_name, st.session_state.start_date, st.session_state.phases, st.session_state.notes)
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    filename = f"project_{timestamp}{'.json' if pretty_json else PROJECT_EXT}"
+    save_project(filename, st.session_state.project_name, st.session_state.start_date, st.session_state.phases, st.session_state.notes, pretty=pretty_json)
+    list_local_projects.clear()
     st.success(f"Project saved as {filename}")
 
-# Generate timeline and plot
+# Generate timeline and plot; it stays shown and tracks later edits to the inputs
 if st.button("📅 Generate Timeline"):
     if not st.session_state.phases:
+        st.session_state.show_timeline = False
         st.warning("Please add at least one phase to generate the timeline.")
     else:
-        current_start = datetime.combine(st.session_state.start_date, datetime.min.time())
-        timeline = []
-
-        for phase in st.session_state.phases:
-            phase_start = current_start
-            phase_end = phase_start + timedelta(weeks=phase["Duration (weeks)"])
-            timeline.append({
-                "Phase": phase["Phase"],
-                "Start Date": phase_start,
-                "End Date": phase_end,
-                "Duration (weeks)": phase["Duration (weeks)"]
-            })
-            current_start = phase_end
-
-        timeline_df = pd.DataFrame(timeline)
-
-        st.subheader(f"📑 {st.session_state.project_name} Timeline")
-        st.dataframe(timeline_df.style.set_properties(**{'background-color': '#f0f0f0', 'color': '#222'}))
-
-        # Progress bar with % label
-        total_weeks = sum(p["Duration (weeks)"] for p in st.session_state.phases)
-        completed_weeks = 0  # You can customize this with actual progress input
-        progress = (completed_weeks / total_weeks) if total_weeks else 0
-        st.progress(progress)
-        st.caption(f"Progress: {progress*100:.1f}% (Customizable in future)")
-
-        # Plot Gantt chart
-        fig = px.timeline(
-            timeline_df,
-            x_start="Start Date",
-            x_end="End Date",
-            y="Phase",
-            color="Phase",
-            title=f"{st.session_state.project_name} Timeline Gantt Chart",
-            hover_data=["Duration (weeks)"]
-        )
-        fig.update_yaxes(autorange="reversed")
-        fig.update_layout(showlegend=False, template="plotly_white")
-
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Download CSV and Excel
-        csv = timeline_df.to_csv(index=False).encode('utf-8')
-        excel_data = to_excel(timeline_df)
-
-        col1, col2 = st.columns(2)
-        col1.download_button("📥 Download CSV", data=csv, file_name=f"{st.session_state.project_name}_timeline.csv", mime="text/csv")
-        col2.download_button("📥 Download Excel", data=excel_data, file_name=f"{st.session_state.project_name}_timeline.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        st.session_state.show_timeline = True
 
-        # Save timeline to JSON option
-        json_str = timeline_df.to_json(date_format="iso", orient="records")
-        st.download_button("📥 Download Timeline JSON", json_str, file_name=f"{st.session_state.project_name}_timeline.json", mime="application/json")
+if st.session_state.get("show_timeline") and st.session_state.phases_key:
+    render_timeline_section()